@@ -1,5 +1,5 @@
 """Top-level package for the jsonstore distribution."""
 
-from .canonicaljson import canonical_json
+from .canonicaljson import canonical_json, canonical_json_with_properties
 
-__all__ = ["canonical_json"]
+__all__ = ["canonical_json", "canonical_json_with_properties"]
@@ -2,10 +2,10 @@
 
 import sqlite3
 import json
-import hashlib
 from typing import Any, List
 
 from jsonstore.canonicaljson import canonical_json
+from jsonstore.hashing import hexdigest
 
 
 def _canonical_json(obj: Any) -> str:
@@ -57,7 +57,7 @@ def insert_array(
     for idx, val in enumerate(array):
         # Store canonical JSON literal representation of each element
         value = canonical_json(val)
-        value_sha1 = hashlib.sha1(value.encode("utf-8")).hexdigest()
+        value_sha1 = hexdigest(value.encode("utf-8"))
         cur.execute(
             f"INSERT OR REPLACE INTO {table_name} (canonical_json_sha1, element_index, element_json, element_json_sha1) VALUES (?, ?, ?, ?)",
             (canonical_json_sha1, idx, value, value_sha1)
@@ -86,7 +86,7 @@ def insert_array_auto_hash(
     """
 
     canonical_json = _canonical_json(array)
-    canonical_json_sha1 = hashlib.sha1(canonical_json.encode("utf-8")).hexdigest()
+    canonical_json_sha1 = hexdigest(canonical_json.encode("utf-8"))
     insert_array(conn, canonical_json_sha1, array, table_name=table_name)
     return canonical_json_sha1
 
@@ -115,7 +115,7 @@ def insert_arrays_auto_hash(
     rows = []
     for array in arrays:
         canonical = _canonical_json(array)
-        sha1 = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+        sha1 = hexdigest(canonical.encode("utf-8"))
         hashes.append(sha1)
         for idx, val in enumerate(array):
             rows.append((sha1, idx, canonical_json(val)))
@@ -1,6 +1,11 @@
 import json
+from functools import lru_cache
+from typing import Any, List, Tuple
+
 import jcs
 
+from jsonstore.hashing import digest
+
 
 def _convert_to_es6(value):
     fvalue = float(value)
@@ -54,13 +59,81 @@ def _convert_to_es6(value):
     return sign + first + dot + last + exp_str
 
 
-def _canonicalize(obj):
-    if obj is None:
+# Integers up to 2**53 are exact as doubles, so their ES6 form is the
+# plain decimal representation.
+_MAX_EXACT_INT = 2**53
+
+
+def _canonicalize_int(value):
+    if -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT:
+        return str(value)
+    return _convert_to_es6(value)
+
+
+# Encoders for scalar leaves keyed by exact type; subclasses such as
+# IntEnum fall through to the generic isinstance checks.
+_SCALAR_ENCODERS = {
+    type(None): lambda _: "null",
+    bool: lambda value: "true" if value else "false",
+    int: _canonicalize_int,
+    float: _convert_to_es6,
+    str: lambda value: json.dumps(value, ensure_ascii=False),
+}
+
+
+# Property values served from _cached_scalar_property: exact scalar types,
+# plus strings of at most _CACHED_STR_MAX characters so that the cache stays
+# small. Containers and long strings are always encoded directly.
+_CACHED_SCALAR_TYPES = frozenset((type(None), bool, int, float))
+_CACHED_STR_MAX = 64
+
+
+@lru_cache(maxsize=4096)
+def _cached_scalar_property(value_type, value) -> Tuple[str, bytes]:
+    """Return the canonical JSON of a scalar value and its raw digest.
+
+    ``value_type`` is part of the cache key so that values which compare
+    equal but encode differently, such as ``1``, ``1.0`` and ``True``, get
+    separate entries.
+    """
+    value_json = _SCALAR_ENCODERS[value_type](value)
+    return value_json, digest(value_json.encode("utf-8"))
+
+
+def _encode_property(value) -> Tuple[str, bytes]:
+    """Return ``(canonical_json, digest)`` of a property value, unverified.
+
+    Scalars and short strings recur often across objects (booleans,
+    enum-like strings, small numbers) and are served from a cache; other
+    values are encoded directly.
+    """
+    value_type = type(value)
+    if value_type in _CACHED_SCALAR_TYPES or (
+        value_type is str and len(value) <= _CACHED_STR_MAX
+    ):
+        return _cached_scalar_property(value_type, value)
+    value_json = _canonicalize(value)
+    return value_json, digest(value_json.encode("utf-8"))
+
+
+def _canonicalize_key(key):
+    if isinstance(key, str):
+        return json.dumps(key, ensure_ascii=False)
+    if key is None:
         return "null"
-    if obj is True:
+    if key is True:
         return "true"
-    if obj is False:
+    if key is False:
         return "false"
+    if isinstance(key, (int, float)):
+        return _convert_to_es6(key)
+    raise TypeError(f"key {key!r} is not JSON serializable")
+
+
+def _canonicalize(obj):
+    encoder = _SCALAR_ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
     if isinstance(obj, (int, float)):
         return _convert_to_es6(obj)
     if isinstance(obj, str):
@@ -70,25 +143,67 @@ def _canonicalize(obj):
     if isinstance(obj, dict):
         items = []
         for key in sorted(obj.keys()):
-            if isinstance(key, str):
-                key_str = json.dumps(key, ensure_ascii=False)
-            elif key is None:
-                key_str = "null"
-            elif key is True:
-                key_str = "true"
-            elif key is False:
-                key_str = "false"
-            elif isinstance(key, (int, float)):
-                key_str = _convert_to_es6(key)
-            else:
-                raise TypeError(f"key {key!r} is not JSON serializable")
-            items.append(f"{key_str}:{_canonicalize(obj[key])}")
+            items.append(f"{_canonicalize_key(key)}:{_canonicalize(obj[key])}")
         return "{" + ",".join(items) + "}"
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
-def canonical_json(obj) -> str:
-    result = _canonicalize(obj)
+def _verify(obj, result: str) -> None:
     jcs_result = jcs.canonicalize(obj).decode("utf-8")
     assert result == jcs_result, f"Canonical mismatch: {result} != {jcs_result}"
+
+
+def canonical_json(obj) -> str:
+    result = _canonicalize(obj)
+    _verify(obj, result)
     return result
+
+
+def canonical_json_fast(obj) -> str:
+    """Return the canonical JSON of ``obj`` with a fast path for scalars.
+
+    ``None``, ``bool``, ``int``, ``float`` and ``str`` values are encoded
+    with a single table lookup and without the ``jcs`` verification; any
+    other value goes through :func:`canonical_json`.
+    """
+    encoder = _SCALAR_ENCODERS.get(type(obj))
+    if encoder is None:
+        return canonical_json(obj)
+    return encoder(obj)
+
+
+def canonical_json_property(value) -> Tuple[str, bytes]:
+    """Return the canonical JSON of a single property value and its digest.
+
+    This shares the scalar cache with
+    :func:`canonical_json_with_properties`. As with
+    :func:`canonical_json_fast`, only values that are not scalars are
+    verified against ``jcs``.
+    """
+    value_json, value_digest = _encode_property(value)
+    if type(value) not in _SCALAR_ENCODERS:
+        _verify(value, value_json)
+    return value_json, value_digest
+
+
+def canonical_json_with_properties(obj: dict) -> Tuple[str, List[Tuple[Any, str, bytes]]]:
+    """Return the canonical JSON of ``obj`` and of each of its properties.
+
+    The properties are returned as ``(name, canonical_json, digest)`` in
+    canonical key order, where ``digest`` is the raw digest of the
+    property JSON. Every property is encoded once and reused for the
+    object encoding, and only the object result is verified against
+    ``jcs`` since it contains every property encoding. Scalar and short
+    string values come with their digest from the same cache as
+    :func:`canonical_json_property`; other properties are hashed
+    while they are encoded.
+    """
+    properties = []
+    items = []
+    for key in sorted(obj.keys()):
+        value, value_digest = _encode_property(obj[key])
+        items.append(f"{_canonicalize_key(key)}:{value}")
+        properties.append((key, value, value_digest))
+    result = "{" + ",".join(items) + "}"
+    _verify(obj, result)
+    return result, properties
@@ -0,0 +1,59 @@
+"""Hash function used to content-address stored JSON.
+
+SHA-1 is used by default. :mod:`hashlib` delegates it to OpenSSL, which
+uses the SHA extensions (SHA-NI) of recent x86 CPUs when CPython is
+linked against OpenSSL 1.1.1 or newer; check ``ssl.OPENSSL_VERSION`` to
+see which library the interpreter uses.
+
+Setting the ``JSONSTORE_HASH`` environment variable to ``blake2b`` selects
+BLAKE2b with a 20 byte digest instead. The digests have the same length
+as SHA-1 but different values, so a database must always be written and
+read with the same setting.
+"""
+
+import hashlib
+import os
+from typing import Any, Callable, Dict
+
+HASH_ENV_VAR = "JSONSTORE_HASH"
+
+# Length in bytes of the digests returned by :func:`digest`; both
+# supported hashes produce 20 bytes.
+DIGEST_SIZE = 20
+
+
+def _blake2b_160(data: bytes = b"") -> Any:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE)
+
+
+_HASHERS: Dict[str, Callable[[bytes], Any]] = {
+    "sha1": hashlib.sha1,
+    "blake2b": _blake2b_160,
+}
+
+
+def _select_hasher(name: str) -> Callable[[bytes], Any]:
+    try:
+        return _HASHERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported {HASH_ENV_VAR} value {name!r}; "
+            f"expected one of {sorted(_HASHERS)}"
+        ) from None
+
+
+_hasher = _select_hasher(os.environ.get(HASH_ENV_VAR, "sha1"))
+
+
+def _hash(data: bytes) -> Any:
+    return _hasher(data)
+
+
+def digest(data: bytes) -> bytes:
+    """Return the raw 20 byte digest of ``data`` using the configured hash."""
+    return _hash(data).digest()
+
+
+def hexdigest(data: bytes) -> str:
+    """Return the hex digest of ``data`` using the configured hash."""
+    return _hash(data).hexdigest()
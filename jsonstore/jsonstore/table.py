@@ -1,8 +1,8 @@
 import sqlite3
-import hashlib
 from typing import Any, List
 
 from jsonstore.canonicaljson import canonical_json
+from jsonstore.hashing import hexdigest
 
 
 def _canonical_json(obj) -> str:
@@ -52,7 +52,7 @@ def insert_json_auto_hash(conn: sqlite3.Connection, obj, table_name: str) -> str
     Returns the computed SHA1 hash string.
     """
     canon = _canonical_json(obj)
-    canon_sha1 = hashlib.sha1(canon.encode("utf-8")).hexdigest()
+    canon_sha1 = hexdigest(canon.encode("utf-8"))
     insert_json(conn, canon_sha1, obj, table_name=table_name)
     return canon_sha1
 
@@ -81,7 +81,7 @@ def insert_jsons_auto_hash(
     rows = []
     for obj in objs:
         canon = _canonical_json(obj)
-        sha1 = hashlib.sha1(canon.encode("utf-8")).hexdigest()
+        sha1 = hexdigest(canon.encode("utf-8"))
         hashes.append(sha1)
         rows.append((sha1, canon))
 
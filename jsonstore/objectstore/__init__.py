@@ -3,10 +3,12 @@
 from .table import (
     create_object_table,
     insert_object,
+    insert_object_raw,
     insert_object_auto_hash,
     insert_objects_auto_hash,
     retrieve_object,
     retrieve_all_objects,
+    iter_all_objects,
 )
 from .view import create_property_concat_view
 from .fts import create_property_concat_fts
@@ -15,10 +17,12 @@ from .store import ObjectStore
 __all__ = [
     "create_object_table",
     "insert_object",
+    "insert_object_raw",
     "insert_object_auto_hash",
     "insert_objects_auto_hash",
     "retrieve_object",
     "retrieve_all_objects",
+    "iter_all_objects",
     "create_property_concat_view",
     "create_property_concat_fts",
     "ObjectStore",
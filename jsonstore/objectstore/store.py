@@ -1,13 +1,15 @@
 import sqlite3
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .table import (
     create_object_table,
     insert_object,
+    insert_object_raw,
     insert_object_auto_hash,
     insert_objects_auto_hash,
     retrieve_object,
     retrieve_all_objects,
+    iter_all_objects,
 )
 from .view import create_property_concat_view
 from .fts import create_property_concat_fts
@@ -49,6 +51,18 @@ class ObjectStore:
             table_name=self.table_name,
         )
 
+    def insert_object_raw(
+        self,
+        canonical_json_sha1: str,
+        items: Iterable[Tuple[str, str, bytes]],
+    ) -> None:
+        insert_object_raw(
+            self.conn,
+            canonical_json_sha1,
+            items,
+            table_name=self.table_name,
+        )
+
     def insert_object_auto_hash(self, obj: Dict[str, Any]) -> str:
         return insert_object_auto_hash(
             self.conn,
@@ -56,7 +70,7 @@ class ObjectStore:
             table_name=self.table_name,
         )
 
-    def insert_objects_auto_hash(self, objs: List[Dict[str, Any]]) -> List[str]:
+    def insert_objects_auto_hash(self, objs: Iterable[Dict[str, Any]]) -> List[str]:
         return insert_objects_auto_hash(
             self.conn,
             objs,
@@ -76,6 +90,12 @@ class ObjectStore:
             table_name=self.table_name,
         )
 
+    def iter_all_objects(self) -> Iterator[Dict[str, Any]]:
+        return iter_all_objects(
+            self.conn,
+            table_name=self.table_name,
+        )
+
     def create_view(self) -> None:
         create_property_concat_view(
             self.conn,
@@ -1,27 +1,214 @@
 # table.py for objectstore
 
+import re
 import sqlite3
-import json
-import hashlib
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
-from jsonstore.canonicaljson import canonical_json
+from jsonstore.canonicaljson import canonical_json_property, canonical_json_with_properties
+from jsonstore.hashing import DIGEST_SIZE, digest, hexdigest
 
+# orjson parses the stored JSON literals noticeably faster than the
+# standard library; it is optional and json.loads is used without it.
+try:
+    from orjson import loads as _orjson_loads
+except ImportError:
+    _orjson_loads = None
+from json import loads as _json_loads
 
-def _canonical_json(obj: Any) -> str:
-    """Return canonical JSON string for hashing.
+# orjson reads integers outside the 64-bit range as floats, whereas json
+# keeps them as int. Such literals have at least 19 digits, so text with a
+# run of 19 digits is parsed with json to keep the stored types.
+_LONG_DIGITS_RE = re.compile(r"\d{19}")
 
-    The function encodes according to the JSON Canonicalization Scheme
-    (JCS) implemented locally and verifies the result using the ``jcs``
-    package. The verification step provides extra safety during
-    development and may be removed in a performance tuned release.
+
+def _loads(text: str) -> Any:
+    if _orjson_loads is None or _LONG_DIGITS_RE.search(text):
+        return _json_loads(text)
+    return _orjson_loads(text)
+
+
+# Number of rows fetched per round trip when scanning a whole table.
+_FETCH_SIZE = 1024
+
+# Number of objects canonicalized and inserted at a time in bulk inserts.
+_BATCH_SIZE = 1024
+
+
+@contextmanager
+def _write_transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run the enclosed inserts atomically.
+
+    Without an open transaction, a ``BEGIN IMMEDIATE`` transaction is
+    started here, committed at the end of the block and rolled back when
+    the block raises. If the caller already has a transaction open, the
+    inserts run inside a savepoint of it instead: they are left
+    uncommitted for the caller, and a failure rolls back to the savepoint
+    so no partial object stays in the caller's transaction.
+    """
+
+    if conn.in_transaction:
+        conn.execute("SAVEPOINT jsonstore_write")
+        try:
+            yield
+        except BaseException:
+            # A failed statement may already have ended the transaction.
+            if conn.in_transaction:
+                conn.execute("ROLLBACK TO jsonstore_write")
+                conn.execute("RELEASE jsonstore_write")
+            raise
+        conn.execute("RELEASE jsonstore_write")
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _object_rows(
+    canonical_json_sha1: str,
+    obj: Dict[str, Any],
+) -> Iterator[Tuple[str, str, str, bytes]]:
+    """Yield one table row per property of ``obj``."""
+    for key, val in obj.items():
+        value, value_sha1 = canonical_json_property(val)
+        yield (canonical_json_sha1, key, value, value_sha1)
+
+
+def _canonicalize_and_hash(
+    objs: List[Dict[str, Any]],
+) -> Tuple[List[str], Iterable[Tuple[str, str, str, bytes]]]:
+    """Canonicalize and hash ``objs`` without touching the database.
+
+    Returns the object hashes in input order and the property rows ready
+    for :func:`_insert_object_rows`.
+    """
+
+    # Each object is canonicalized once together with its properties.
+    encoded = [canonical_json_with_properties(obj) for obj in objs]
+    hashes = [hexdigest(canon.encode("utf-8")) for canon, _ in encoded]
+
+    # Collect the row columns as four flat lists extended once per object
+    # and zip them lazily for executemany, instead of building a tuple per
+    # property here.
+    row_hashes: List[str] = []
+    names: List[str] = []
+    values: List[str] = []
+    value_hashes: List[bytes] = []
+    for sha1, (_, properties) in zip(hashes, encoded):
+        if not properties:
+            continue
+        obj_names, obj_values, obj_value_hashes = zip(*properties)
+        row_hashes.extend([sha1] * len(properties))
+        names.extend(obj_names)
+        values.extend(obj_values)
+        value_hashes.extend(obj_value_hashes)
+    return hashes, zip(row_hashes, names, values, value_hashes)
+
+
+_TABLE_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+_SQL_TEMPLATES: Dict[str, str] = {
+    "create": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            canonical_json_sha1 TEXT NOT NULL,
+            property_name TEXT NOT NULL,
+            property_json TEXT,
+            property_json_sha1 BLOB,
+            PRIMARY KEY (canonical_json_sha1, property_name)
+        ) WITHOUT ROWID;
+        """,
+    "drop_hash_index": "DROP INDEX IF EXISTS idx_{table}_hash;",
+    "table_info": "PRAGMA table_info({table})",
+    "select_rows": "SELECT canonical_json_sha1, property_name, property_json, property_json_sha1 FROM {table}",
+    "drop_table": "DROP TABLE {table}",
+    "rename_migrated": "ALTER TABLE {table}__migrating RENAME TO {table}",
+    "insert": "INSERT OR REPLACE INTO {table} (canonical_json_sha1, property_name, property_json, property_json_sha1) VALUES (?, ?, ?, ?)",
+    "select_object": "SELECT property_name, property_json FROM {table} WHERE canonical_json_sha1 = ?",
+    # property_json already holds JSON text; json() marks it as such so that
+    # json_group_object embeds it instead of quoting it as a string.
+    "select_all": (
+        "SELECT json_group_object(property_name, json(property_json)) FROM {table}"
+        " GROUP BY canonical_json_sha1 ORDER BY canonical_json_sha1"
+    ),
+}
+
+
+@lru_cache(maxsize=128)
+def _sql(op: str, table: str) -> str:
+    """Return the SQL statement ``op`` for ``table``.
+
+    Table names are interpolated into the SQL, so they are restricted to
+    plain identifiers. Returning the same cached str for every call also
+    lets the sqlite3 statement cache find the prepared statement; callers
+    working with many tables can enlarge that cache with
+    ``sqlite3.connect(path, cached_statements=256)``.
+    """
+
+    if not _TABLE_NAME_RE.fullmatch(table):
+        raise ValueError(f"Invalid table name: {table!r}")
+    return _SQL_TEMPLATES[op].format(table=table)
+
+
+def _insert_object_rows(
+    conn: sqlite3.Connection,
+    rows: Iterable[Tuple[str, str, str, bytes]],
+    table_name: str,
+) -> None:
+    """Insert property rows without committing."""
+    conn.executemany(_sql("insert", table_name), rows)
+
+
+def _legacy_row(row: Tuple[str, str, Any, Any]) -> Tuple[str, str, Any, Any]:
+    """Return ``row`` with ``property_json_sha1`` as a raw digest."""
+    obj_hash, name, value, value_sha1 = row
+    if isinstance(value_sha1, str):
+        value_sha1 = bytes.fromhex(value_sha1)
+    elif value_sha1 is None and value is not None:
+        value_sha1 = digest(value.encode("utf-8"))
+    return obj_hash, name, value, value_sha1
+
+
+def _migrate_property_json_sha1(conn: sqlite3.Connection, table_name: str) -> None:
+    """Rebuild tables from earlier versions into the current schema.
+
+    Earlier versions declared ``property_json_sha1`` as TEXT in a rowid
+    table and stored hex digests, or left it NULL for rows written by
+    ``insert_objects_auto_hash``. Such a table is copied row by row into a
+    new ``WITHOUT ROWID`` table with a BLOB column, converting hex values
+    to raw bytes and computing missing digests, and then replaces the
+    original. The declared BLOB type records that the migration is done,
+    so later calls only read the table schema.
     """
 
-    return canonical_json(obj)
+    columns = conn.execute(_sql("table_info", table_name)).fetchall()
+    if not any(col[1] == "property_json_sha1" and col[2].upper() == "TEXT" for col in columns):
+        return
+    migrating = f"{table_name}__migrating"
+    with _write_transaction(conn):
+        conn.execute(_sql("create", migrating))
+        conn.executemany(
+            _sql("insert", migrating),
+            map(_legacy_row, conn.execute(_sql("select_rows", table_name))),
+        )
+        conn.execute(_sql("drop_table", table_name))
+        # Views over the table refer to it by name; the legacy rename keeps
+        # SQLite from checking them while the original table is missing.
+        conn.execute("PRAGMA legacy_alter_table=ON")
+        try:
+            conn.execute(_sql("rename_migrated", table_name))
+        finally:
+            conn.execute("PRAGMA legacy_alter_table=OFF")
 
 
 def create_object_table(conn: sqlite3.Connection, table_name: str) -> None:
-    """Create table and indexes to store object properties.
+    """Create table to store object properties.
 
     Parameters
     ----------
@@ -29,22 +216,30 @@ def create_object_table(conn: sqlite3.Connection, table_name: str) -> None:
         SQLite connection.
     table_name : str
         Name of the table to create.
+
+    Notes
+    -----
+    The connection is also switched to WAL journaling with
+    ``synchronous=NORMAL``, in-memory temporary storage and a 64 MiB page
+    cache, which speeds up bulk inserts into disk-backed databases.
+    ``:memory:`` databases keep their in-memory journal.
+
+    Tables created by earlier versions, which stored ``property_json_sha1``
+    as hex TEXT, are rebuilt once into the current schema with 20 byte
+    BLOB digests.
     """
-    conn.execute(
-        f"""
-        CREATE TABLE IF NOT EXISTS {table_name} (
-            canonical_json_sha1 TEXT NOT NULL,
-            property_name TEXT NOT NULL,
-            property_json TEXT,
-            property_json_sha1 TEXT,
-            PRIMARY KEY (canonical_json_sha1, property_name)
-        );
-        """
-    )
-    conn.execute(
-        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_hash ON {table_name}(canonical_json_sha1);"
-    )
+    conn.execute(_sql("create", table_name))
+    _migrate_property_json_sha1(conn, table_name)
+    # The primary key already serves lookups by canonical_json_sha1, so the
+    # separate hash index created by earlier versions only slowed inserts.
+    conn.execute(_sql("drop_hash_index", table_name))
     conn.commit()
+    # journal_mode cannot be changed inside a transaction, so apply the
+    # pragmas only after the schema has been committed.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
 
 
 def insert_object(
@@ -54,15 +249,66 @@ def insert_object(
     table_name: str,
 ) -> None:
     """Insert a Python dict into the table preserving JSON types."""
-    cur = conn.cursor()
-    for key, val in obj.items():
-        value = canonical_json(val)
-        value_sha1 = hashlib.sha1(value.encode("utf-8")).hexdigest()
-        cur.execute(
-            f"INSERT OR REPLACE INTO {table_name} (canonical_json_sha1, property_name, property_json, property_json_sha1) VALUES (?, ?, ?, ?)",
-            (canonical_json_sha1, key, value, value_sha1),
+    with _write_transaction(conn):
+        _insert_object_rows(
+            conn, _object_rows(canonical_json_sha1, obj), table_name
+        )
+
+
+def _check_digest(value_sha1: Any) -> bytes:
+    """Return ``value_sha1`` if it is a raw digest of the configured size."""
+    if not isinstance(value_sha1, bytes):
+        raise TypeError(
+            f"property digest must be bytes, not {type(value_sha1).__name__}"
+        )
+    if len(value_sha1) != DIGEST_SIZE:
+        raise ValueError(
+            f"property digest must be {DIGEST_SIZE} bytes, got {len(value_sha1)}"
+        )
+    return value_sha1
+
+
+def insert_object_raw(
+    conn: sqlite3.Connection,
+    canonical_json_sha1: str,
+    items: Iterable[Tuple[str, str, bytes]],
+    table_name: str,
+) -> None:
+    """Insert properties that are already canonicalized and hashed.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        SQLite connection.
+    canonical_json_sha1 : str
+        Hash ID of the object.
+    items : iterable of tuple
+        ``(property_name, canonical_json, digest)`` for each property, as
+        returned by :func:`jsonstore.canonical_json_with_properties`. The
+        values are stored verbatim; neither canonicalization nor hashing
+        is performed. ``digest`` must be the raw ``bytes`` digest of
+        ``DIGEST_SIZE`` bytes, not a hex string.
+    table_name : str
+        Name of the table.
+
+    Raises
+    ------
+    TypeError
+        If a digest is not ``bytes``.
+    ValueError
+        If a digest does not have the configured length. Nothing is
+        inserted in either case.
+    """
+
+    with _write_transaction(conn):
+        _insert_object_rows(
+            conn,
+            (
+                (canonical_json_sha1, name, value, _check_digest(value_sha1))
+                for name, value, value_sha1 in items
+            ),
+            table_name,
         )
-    conn.commit()
 
 
 def insert_object_auto_hash(
@@ -87,15 +333,15 @@ def insert_object_auto_hash(
         The computed SHA1 hash of the canonical JSON representation.
     """
 
-    canonical_json = _canonical_json(obj)
-    canonical_json_sha1 = hashlib.sha1(canonical_json.encode("utf-8")).hexdigest()
-    insert_object(conn, canonical_json_sha1, obj, table_name=table_name)
+    canon, properties = canonical_json_with_properties(obj)
+    canonical_json_sha1 = hexdigest(canon.encode("utf-8"))
+    insert_object_raw(conn, canonical_json_sha1, properties, table_name=table_name)
     return canonical_json_sha1
 
 
 def insert_objects_auto_hash(
     conn: sqlite3.Connection,
-    objs: List[Dict[str, Any]],
+    objs: Iterable[Dict[str, Any]],
     table_name: str,
 ) -> List[str]:
     """Insert multiple objects computing canonical JSON SHA1 for each.
@@ -104,8 +350,8 @@ def insert_objects_auto_hash(
     ----------
     conn : sqlite3.Connection
         SQLite connection.
-    objs : list of dict
-        Objects to store.
+    objs : iterable of dict
+        Objects to store. Any iterable is accepted, including generators.
     table_name : str
         Name of the table.
 
@@ -115,19 +361,16 @@ def insert_objects_auto_hash(
         SHA1 hashes for the canonical JSON of each object, in input order.
     """
 
+    # Objects are taken in slices of _BATCH_SIZE so that any iterable,
+    # including a generator, is accepted and only one batch of encoded rows
+    # is held in memory at a time.
     hashes: List[str] = []
-    cur = conn.cursor()
-    insert_sql = (
-        f"INSERT OR REPLACE INTO {table_name} (canonical_json_sha1, property_name, property_json)"
-        f" VALUES (?, ?, ?)"
-    )
-    for obj in objs:
-        canon = _canonical_json(obj)
-        sha1 = hashlib.sha1(canon.encode("utf-8")).hexdigest()
-        for key, val in obj.items():
-            cur.execute(insert_sql, (sha1, key, canonical_json(val)))
-        hashes.append(sha1)
-    conn.commit()
+    it = iter(objs)
+    with _write_transaction(conn):
+        for batch in iter(lambda: list(islice(it, _BATCH_SIZE)), []):
+            batch_hashes, rows = _canonicalize_and_hash(batch)
+            _insert_object_rows(conn, rows, table_name)
+            hashes.extend(batch_hashes)
     return hashes
 
 
@@ -137,40 +380,27 @@ def retrieve_object(
     table_name: str,
 ) -> Dict[str, Any]:
     """Retrieve a Python dict previously stored with insert_object."""
-    cur = conn.cursor()
-    cur.execute(
-        f"SELECT property_name, property_json FROM {table_name} WHERE canonical_json_sha1 = ?",
-        (canonical_json_sha1,),
-    )
-    rows = cur.fetchall()
+    rows = conn.execute(_sql("select_object", table_name), (canonical_json_sha1,)).fetchall()
     result = {}
     for row in rows:
-        result[row[0]] = json.loads(row[1]) if row[1] is not None else None
+        result[row[0]] = _loads(row[1]) if row[1] is not None else None
     return result
 
 
-def retrieve_all_objects(conn: sqlite3.Connection, table_name: str) -> List[Dict[str, Any]]:
-    """Return all objects stored in ``table_name`` as a list of dicts."""
-    cur = conn.cursor()
-    cur.execute(
-        f"SELECT canonical_json_sha1, property_name, property_json FROM {table_name} ORDER BY canonical_json_sha1"
-    )
-    rows = cur.fetchall()
+def iter_all_objects(conn: sqlite3.Connection, table_name: str) -> Iterator[Dict[str, Any]]:
+    """Yield the objects stored in ``table_name`` one at a time.
 
-    results: List[Dict[str, Any]] = []
-    current_hash = None
-    current_obj: Dict[str, Any] = {}
+    SQLite assembles each object into a single JSON text with
+    ``json_group_object``, so Python parses one document per object rather
+    than one per property. Results are streamed from the cursor in batches
+    of ``_FETCH_SIZE`` objects.
+    """
+    cur = conn.execute(_sql("select_all", table_name))
+    cur.arraysize = _FETCH_SIZE
+    for row in chain.from_iterable(iter(cur.fetchmany, [])):
+        yield _loads(row[0])
 
-    for row in rows:
-        obj_hash = row[0]
-        if obj_hash != current_hash:
-            if current_hash is not None:
-                results.append(current_obj)
-            current_obj = {}
-            current_hash = obj_hash
-        current_obj[row[1]] = json.loads(row[2]) if row[2] is not None else None
-
-    if current_hash is not None:
-        results.append(current_obj)
-
-    return results
+
+def retrieve_all_objects(conn: sqlite3.Connection, table_name: str) -> List[Dict[str, Any]]:
+    """Return all objects stored in ``table_name`` as a list of dicts."""
+    return list(iter_all_objects(conn, table_name))
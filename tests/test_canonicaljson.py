@@ -1,10 +1,12 @@
 import os
 import sys
+import hashlib
 import jcs
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from jsonstore import canonical_json
+from jsonstore import canonical_json, canonical_json_with_properties
+from jsonstore.canonicaljson import canonical_json_fast
 
 
 def test_canonical_numbers():
@@ -51,3 +53,38 @@ def test_control_chars_in_strings():
     }
     expected = jcs.canonicalize(obj).decode("utf-8")
     assert canonical_json(obj) == expected
+
+
+def test_canonical_json_with_properties():
+    obj = {"b": [1, 2.0], "a": {"y": True, "x": None}, "c": "テキスト"}
+    canon, properties = canonical_json_with_properties(obj)
+
+    assert canon == canonical_json(obj)
+    assert [name for name, _, _ in properties] == ["a", "b", "c"]
+    for name, value, value_digest in properties:
+        assert value == canonical_json(obj[name])
+        assert value_digest == hashlib.sha1(value.encode("utf-8")).digest()
+
+
+def test_canonical_json_fast_scalars():
+    values = [
+        None,
+        True,
+        False,
+        0,
+        -1,
+        2**53,
+        2**53 + 1,
+        -(2**60),
+        10**21,
+        0.1,
+        -0.0,
+        1e-7,
+        1e21,
+        "",
+        "text",
+        "😀\n\u0001\"",
+    ]
+    for val in values:
+        assert canonical_json_fast(val) == jcs.canonicalize(val).decode("utf-8")
+    assert canonical_json_fast({"b": [1, 2]}) == canonical_json({"b": [1, 2]})
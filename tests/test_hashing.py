@@ -0,0 +1,28 @@
+import os
+import sys
+import hashlib
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from jsonstore import hashing  # noqa: E402
+
+
+def test_default_hash_is_sha1():
+    if os.environ.get(hashing.HASH_ENV_VAR, "sha1") != "sha1":
+        pytest.skip("non-default hash selected")
+    assert hashing.hexdigest(b"abc") == hashlib.sha1(b"abc").hexdigest()
+    assert hashing.digest(b"abc") == hashlib.sha1(b"abc").digest()
+
+
+def test_select_blake2b():
+    hasher = hashing._select_hasher("blake2b")
+    expected = hashlib.blake2b(b"abc", digest_size=20).hexdigest()
+    assert hasher(b"abc").hexdigest() == expected
+    assert len(hasher(b"abc").digest()) == 20
+
+
+def test_select_unknown_hash():
+    with pytest.raises(ValueError):
+        hashing._select_hasher("md5")
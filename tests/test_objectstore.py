@@ -4,16 +4,21 @@ import sqlite3
 import json
 import hashlib
 
+import pytest
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from jsonstore.objectstore.table import (
     create_object_table,
     insert_object,
+    insert_object_raw,
     insert_object_auto_hash,
     insert_objects_auto_hash,
     retrieve_object,
     retrieve_all_objects,
+    iter_all_objects,
 )
-from jsonstore import canonical_json
+from jsonstore import canonical_json, canonical_json_with_properties
+from jsonstore.objectstore.view import create_property_concat_view
 
 
 def test_object_storage():
@@ -123,7 +128,7 @@ def test_property_json_is_canonical():
         stored = row[1]
         sha1_val = row[2]
         canonical = canonical_json(obj[name])
-        expected_sha1 = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+        expected_sha1 = hashlib.sha1(canonical.encode("utf-8")).digest()
         assert stored == canonical
         assert sha1_val == expected_sha1
     conn.close()
@@ -165,3 +170,316 @@ def test_retrieve_all_objects():
 
     assert records_sorted == data
     conn.close()
+
+
+def test_insert_objects_auto_hash_is_atomic():
+    """A failing object must not leave earlier objects half inserted."""
+    objs = [
+        {"a": 1},
+        {"b": object()},
+    ]
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    with pytest.raises(TypeError):
+        insert_objects_auto_hash(conn, objs, table_name="objectstore")
+
+    assert not conn.in_transaction
+    assert retrieve_all_objects(conn, table_name="objectstore") == []
+    conn.close()
+
+
+def test_create_object_table_enables_wal(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "objects.db"))
+
+    create_object_table(conn, table_name="objectstore")
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    insert_object(conn, "h", {"a": 1}, table_name="objectstore")
+    assert retrieve_object(conn, "h", table_name="objectstore") == {"a": 1}
+    conn.close()
+
+
+def test_iter_all_objects():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    data = [{"v": i, "w": [i, None]} for i in range(3)]
+    insert_objects_auto_hash(conn, data, table_name="objectstore")
+
+    iterator = iter_all_objects(conn, table_name="objectstore")
+    assert not isinstance(iterator, list)
+    records_sorted = sorted(iterator, key=lambda x: x["v"])
+
+    assert records_sorted == data
+
+    create_object_table(conn, table_name="empty_objects")
+    assert list(iter_all_objects(conn, table_name="empty_objects")) == []
+    conn.close()
+
+
+def test_equal_values_of_different_types_are_kept_apart():
+    """The shared property cache must not confuse 1, 1.0 and True."""
+    values = [1, True, 1.0, 1.5, 0, False, (1,), (True,), "1", "true"]
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    # Insert every value twice so the second round is served from the cache.
+    for round_no in range(2):
+        for i, val in enumerate(values):
+            insert_object(conn, f"h{round_no}_{i}", {"v": val}, table_name="objectstore")
+
+    for round_no in range(2):
+        restored = [
+            retrieve_object(conn, f"h{round_no}_{i}", table_name="objectstore")["v"]
+            for i in range(len(values))
+        ]
+        assert restored == [1, True, 1, 1.5, 0, False, [1], [True], "1", "true"]
+        assert [type(v) for v in restored] == [
+            int, bool, int, float, int, bool, list, list, str, str,
+        ]
+        assert type(restored[7][0]) is bool
+
+    # The bulk path shares the same cache and must keep the types apart too.
+    objs = [{"i": i, "v": val} for i, val in enumerate(values)]
+    hashes = insert_objects_auto_hash(conn, objs, table_name="objectstore")
+    restored = [retrieve_object(conn, h, table_name="objectstore")["v"] for h in hashes]
+    assert [type(v) for v in restored] == [
+        int, bool, int, float, int, bool, list, list, str, str,
+    ]
+    assert type(restored[7][0]) is bool
+    conn.close()
+
+
+def test_create_object_table_has_no_redundant_hash_index():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE objectstore (canonical_json_sha1 TEXT NOT NULL, property_name TEXT NOT NULL, "
+        "property_json TEXT, property_json_sha1 TEXT, PRIMARY KEY (canonical_json_sha1, property_name))"
+    )
+    conn.execute("CREATE INDEX idx_objectstore_hash ON objectstore(canonical_json_sha1)")
+
+    create_object_table(conn, table_name="objectstore")
+
+    indexes = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_objectstore_hash'"
+    ).fetchall()
+    assert indexes == []
+    conn.close()
+
+
+def test_object_table_is_without_rowid():
+    conn = sqlite3.connect(":memory:")
+
+    create_object_table(conn, table_name="objectstore")
+
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("SELECT rowid FROM objectstore")
+    conn.close()
+
+
+def test_insert_objects_auto_hash_multiple_batches():
+    objs = [{"n": i, "flag": i % 2 == 0} for i in range(2500)]
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    hashes = insert_objects_auto_hash(conn, objs, table_name="objectstore")
+
+    expected = [
+        hashlib.sha1(canonical_json(o).encode("utf-8")).hexdigest() for o in objs
+    ]
+    assert hashes == expected
+    records = retrieve_all_objects(conn, table_name="objectstore")
+    assert sorted(records, key=lambda x: x["n"]) == objs
+    conn.close()
+
+
+def test_insert_objects_auto_hash_accepts_generator():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    hashes = insert_objects_auto_hash(
+        conn, ({"n": i} for i in range(2500)), table_name="objectstore"
+    )
+
+    assert len(hashes) == 2500
+    assert retrieve_object(conn, hashes[-1], table_name="objectstore") == {"n": 2499}
+    conn.close()
+
+
+def test_invalid_table_name_is_rejected():
+    conn = sqlite3.connect(":memory:")
+
+    with pytest.raises(ValueError):
+        create_object_table(conn, table_name="objects; DROP TABLE x")
+    with pytest.raises(ValueError):
+        insert_object(conn, "h", {"a": 1}, table_name="1objects")
+    conn.close()
+
+
+def test_retrieve_all_objects_preserves_types():
+    data = [
+        {"s": "null", "t": "true", "n": None, "b": False, "f": 1e-7, "i": -1},
+        {"nested": {"x": [1, 2.5, "😀"]}, "ctrl": "a\u0001\"b\"", "big": 1e30},
+    ]
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    insert_objects_auto_hash(conn, data, table_name="objectstore")
+
+    records = retrieve_all_objects(conn, table_name="objectstore")
+    assert sorted(records, key=lambda x: "s" in x) == sorted(data, key=lambda x: "s" in x)
+    for record in records:
+        original = data[0] if "s" in record else data[1]
+        for key, val in original.items():
+            assert type(record[key]) is type(val)
+    conn.close()
+
+
+def test_insert_object_raw():
+    obj = {"a": [1, 2], "b": "text", "c": None}
+    canon, properties = canonical_json_with_properties(obj)
+    obj_hash = hashlib.sha1(canon.encode("utf-8")).hexdigest()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    insert_object_raw(conn, obj_hash, properties, table_name="objectstore")
+
+    assert retrieve_object(conn, obj_hash, table_name="objectstore") == obj
+    rows = conn.execute(
+        "SELECT property_name, property_json, property_json_sha1 FROM objectstore ORDER BY property_name"
+    ).fetchall()
+    assert [tuple(row) for row in rows] == properties
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "bad_digest, error",
+    [(hashlib.sha1(b"1").hexdigest(), TypeError), (b"\x00" * 16, ValueError)],
+)
+def test_insert_object_raw_rejects_bad_digest(bad_digest, error):
+    conn = sqlite3.connect(":memory:")
+
+    create_object_table(conn, table_name="objectstore")
+    items = [("a", "1", hashlib.sha1(b"1").digest()), ("b", "1", bad_digest)]
+    with pytest.raises(error):
+        insert_object_raw(conn, "h", items, table_name="objectstore")
+
+    assert conn.execute("SELECT COUNT(*) FROM objectstore").fetchone()[0] == 0
+    conn.close()
+
+
+def test_insert_object_joins_open_transaction():
+    """Inserts inside a caller's transaction are rolled back with it."""
+    conn = sqlite3.connect(":memory:")
+
+    create_object_table(conn, table_name="objectstore")
+    conn.execute("CREATE TABLE audit (msg TEXT)")
+    conn.commit()
+
+    conn.execute("INSERT INTO audit (msg) VALUES ('pending')")
+    insert_object(conn, "h", {"a": 1}, table_name="objectstore")
+    assert conn.in_transaction
+    conn.rollback()
+
+    assert conn.execute("SELECT COUNT(*) FROM audit").fetchone()[0] == 0
+    assert retrieve_object(conn, "h", table_name="objectstore") == {}
+    conn.close()
+
+
+def test_failed_insert_in_open_transaction_leaves_no_rows():
+    """A failing insert inside a caller's transaction keeps the caller's rows only."""
+    conn = sqlite3.connect(":memory:")
+
+    create_object_table(conn, table_name="objectstore")
+    conn.execute("CREATE TABLE audit (msg TEXT)")
+    conn.commit()
+
+    conn.execute("INSERT INTO audit (msg) VALUES ('pending')")
+    with pytest.raises(TypeError):
+        insert_object(conn, "h", {"a": 1, "b": object()}, table_name="objectstore")
+    objs = [{"n": i} for i in range(1500)] + [{"bad": object()}]
+    with pytest.raises(TypeError):
+        insert_objects_auto_hash(conn, objs, table_name="objectstore")
+    assert conn.in_transaction
+    conn.commit()
+
+    assert conn.execute("SELECT COUNT(*) FROM audit").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM objectstore").fetchone()[0] == 0
+    conn.close()
+
+
+def test_create_object_table_migrates_hex_property_sha1():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE objectstore (canonical_json_sha1 TEXT NOT NULL, property_name TEXT NOT NULL, "
+        "property_json TEXT, property_json_sha1 TEXT, PRIMARY KEY (canonical_json_sha1, property_name))"
+    )
+    conn.execute(
+        "INSERT INTO objectstore VALUES ('h', 'a', '1', ?)",
+        (hashlib.sha1(b"1").hexdigest(),),
+    )
+    conn.execute("INSERT INTO objectstore VALUES ('h', 'b', 'true', NULL)")
+    conn.commit()
+    create_property_concat_view(conn, "objectstore_concat", "objectstore")
+
+    create_object_table(conn, table_name="objectstore")
+    insert_object(conn, "h2", {"c": None}, table_name="objectstore")
+
+    rows = conn.execute(
+        "SELECT property_json, property_json_sha1 FROM objectstore ORDER BY property_name"
+    ).fetchall()
+    assert len(rows) == 3
+    for value, value_sha1 in rows:
+        assert value_sha1 == hashlib.sha1(value.encode("utf-8")).digest()
+
+    # The table is rebuilt into the current schema, views over it keep
+    # working and a second call leaves it alone.
+    columns = {col[1]: col[2] for col in conn.execute("PRAGMA table_info(objectstore)")}
+    assert columns["property_json_sha1"] == "BLOB"
+    sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='objectstore'"
+    ).fetchone()[0]
+    assert "WITHOUT ROWID" in sql
+    assert conn.execute("SELECT COUNT(*) FROM objectstore_concat").fetchone()[0] == 2
+    create_object_table(conn, table_name="objectstore")
+    assert conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='objectstore'"
+    ).fetchone()[0] == sql
+    conn.close()
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_large_integers_keep_int_type(monkeypatch, use_orjson):
+    from jsonstore.objectstore import table
+
+    if use_orjson and table._orjson_loads is None:
+        pytest.skip("orjson is not installed")
+    if not use_orjson:
+        monkeypatch.setattr(table, "_orjson_loads", None)
+    data = {"a": 10**20, "b": 2**64, "c": -(2**63) - 1, "d": [2**64, 1.5], "e": 2**63 - 1}
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+
+    create_object_table(conn, table_name="objectstore")
+    obj_hash = insert_object_auto_hash(conn, data, table_name="objectstore")
+
+    # Integers beyond 2**53 are stored in their ES6 double form, so compare
+    # with what the standard json module reads back from the canonical text.
+    expected = json.loads(canonical_json(data))
+    for restored in (
+        retrieve_object(conn, obj_hash, table_name="objectstore"),
+        retrieve_all_objects(conn, table_name="objectstore")[0],
+    ):
+        assert restored == expected
+        assert all(type(restored[k]) is int for k in "abce")
+        assert type(restored["d"][0]) is int
+    conn.close()